@@ -0,0 +1,136 @@
+import os
+import requests
+import urllib3
+import orjson
+import threading
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+def download(url : str, path : str, n_ranges : int = 8, retries : int = 5,
+             timeout : float = 60, stop : threading.Event = None) -> bool:
+    """Download `url` to `path`. If the server supports range requests the
+    file is split into `n_ranges` parts which are fetched in parallel and
+    written at their offsets. Progress is recorded next to the file so an
+    interrupted download resumes where it stopped, as long as the ETag of
+    the file has not changed. Failed range requests (connection errors,
+    timeouts, 429 and 5xx responses) are retried up to `retries` times; on
+    401 or 403 the redirect from `url` is followed again before retrying.
+    Setting `stop` abandons the download, keeping its progress for a later
+    run. Returns False if the file is not available or the download was
+    stopped."""
+    source = url
+    head = requests.head(url, allow_redirects=True, timeout=timeout)
+    if head.status_code != 200:
+        return False
+    # Fetch the ranges from the final location rather than following the
+    # redirect on every request
+    url = head.url
+    length = int(head.headers.get('Content-Length', 0))
+    etag = head.headers.get('ETag')
+    if head.headers.get('Accept-Ranges') != 'bytes' or length == 0:
+        with requests.get(url, stream=True, timeout=timeout) as response:
+            if response.status_code != 200:
+                return False
+            with open(path, 'wb') as out:
+                shutil.copyfileobj(response.raw, out)
+        return True
+
+    state_path = path + ".state"
+    state = None
+    if etag and os.path.exists(path) and os.path.exists(state_path):
+        # A state file that cannot be read is treated as no state, so the
+        # download starts over
+        try:
+            with open(state_path, 'rb') as f:
+                state = orjson.loads(f.read())
+            if state['etag'] != etag or state['length'] != length:
+                state = None
+        except (orjson.JSONDecodeError, KeyError, TypeError):
+            state = None
+    if state is None:
+        with open(path, 'wb') as out:
+            out.truncate(length)
+        size = -(-length // n_ranges)
+        # Each range is [start, end, bytes written so far]
+        state = {'etag': etag, 'length': length,
+                 'ranges': [[start, min(start + size, length) - 1, 0]
+                            for start in range(0, length, size)]}
+    lock = threading.Lock()
+    changed = threading.Event()
+    stop = stop or threading.Event()
+
+    def save_state():
+        # Written to a temporary file and moved into place, so an interrupted
+        # write never leaves a truncated state file
+        with lock:
+            with open(state_path + ".tmp", 'wb') as f:
+                f.write(orjson.dumps(state))
+            os.replace(state_path + ".tmp", state_path)
+
+    def fetch(r : list):
+        nonlocal url
+        start, end = r[0], r[1]
+        for attempt in range(retries):
+            if start + r[2] > end or changed.is_set() or stop.is_set():
+                return
+            if attempt > 0:
+                time.sleep(min(2 ** attempt, 30))
+            headers = {'Range': 'bytes=%d-%d' % (start + r[2], end)}
+            if etag:
+                headers['If-Range'] = etag
+            try:
+                with requests.get(url, headers=headers, stream=True,
+                                  timeout=timeout) as response:
+                    if response.status_code == 200:
+                        # The If-Range guard failed, so the file has changed
+                        # and the saved progress is no longer valid
+                        changed.set()
+                        raise IOError("%s changed during download" % url)
+                    if response.status_code in (401, 403):
+                        # The redirect target may be a signed URL that has
+                        # expired, so resolve the original URL again
+                        url = requests.head(source, allow_redirects=True,
+                                            timeout=timeout).url
+                        raise requests.HTTPError("Range request for %s failed: %d" %
+                                                 (url, response.status_code))
+                    if response.status_code == 429 or response.status_code >= 500:
+                        # Transient, so retry
+                        raise requests.HTTPError("Range request for %s failed: %d" %
+                                                 (url, response.status_code))
+                    if response.status_code != 206:
+                        raise IOError("Range request for %s failed: %d" %
+                                      (url, response.status_code))
+                    # Unbuffered, so the recorded progress is never ahead
+                    # of the bytes handed to the OS
+                    with open(path, 'r+b', buffering=0) as out:
+                        out.seek(start + r[2])
+                        for i, chunk in enumerate(response.raw.stream(
+                                1 << 16, decode_content=False)):
+                            if stop.is_set():
+                                break
+                            out.write(chunk)
+                            r[2] += len(chunk)
+                            if i % 128 == 127:
+                                save_state()
+            except (requests.RequestException, urllib3.exceptions.HTTPError,
+                    ConnectionError):
+                pass
+            save_state()
+        if start + r[2] <= end and not changed.is_set() and not stop.is_set():
+            raise IOError("Failed to download %s after %d attempts" %
+                          (url, retries))
+
+    save_state()
+    try:
+        with ThreadPoolExecutor(max_workers=n_ranges) as pool:
+            futures = [pool.submit(fetch, r) for r in state['ranges']]
+            for future in futures:
+                future.result()
+    finally:
+        if changed.is_set() and os.path.exists(state_path):
+            os.remove(state_path)
+    if stop.is_set():
+        return False
+    os.remove(state_path)
+    return True
@@ -1,36 +1,216 @@
 import gzip
-import requests 
 import spacy
 import sys
-import json
-from io import BytesIO
+import os
+import orjson
 import tqdm
+import queue
+import threading
+import functools
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from spacy.attrs import IDX, LENGTH, POS, LEMMA
+from download import download
+
+def annotate(doc, cache : dict):
+    """Extract the word spans, POS tags and lemmas of a tagged document.
+
+    The token attributes are read in one call with `Doc.to_array` rather
+    than through the per-token Python properties. POS and lemma hashes are
+    resolved through `cache`, so each distinct value is looked up in the
+    string store only once."""
+    arr = doc.to_array([IDX, LENGTH, POS, LEMMA])
+    strings = doc.vocab.strings
+    def lookup(h):
+        s = cache.get(h)
+        if s is None:
+            s = cache[h] = strings[h]
+        return s
+    words = np.stack([arr[:, 0], arr[:, 0] + arr[:, 1]], axis=1).tolist()
+    pos = [lookup(h) for h in arr[:, 2].tolist()]
+    lemma = [lookup(h) for h in arr[:, 3].tolist()]
+    return words, pos, lemma
+
+class BackgroundWriter:
+    """Write to a gzip file from a separate thread, so that compression
+    does not block the tagging loop. Writes are collected into blocks of
+    `buffer_size` bytes and at most `maxsize` blocks are queued. An error in
+    the writing thread is raised by the next call to `write` or `close`."""
+    def __init__(self, path : str, compresslevel : int = 1,
+                 buffer_size : int = 1 << 20, maxsize : int = 32):
+        self.out = gzip.open(path, 'wb', compresslevel=compresslevel)
+        self.buffer = bytearray()
+        self.buffer_size = buffer_size
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.error = None
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while True:
+            data = self.queue.get()
+            if data is None:
+                break
+            # After a failure keep draining the queue, so that the producer
+            # is never blocked on a full queue
+            if self.error is None:
+                try:
+                    self.out.write(data)
+                except Exception as e:
+                    self.error = e
+
+    def _check(self):
+        if self.error is not None:
+            raise self.error
+
+    def write(self, data : bytes):
+        self._check()
+        self.buffer += data
+        if len(self.buffer) > self.buffer_size:
+            self.queue.put(bytes(self.buffer))
+            self.buffer.clear()
+
+    def close(self):
+        if self.buffer and self.error is None:
+            self.queue.put(bytes(self.buffer))
+        self.buffer.clear()
+        self.queue.put(None)
+        self.thread.join()
+        try:
+            self.out.close()
+        finally:
+            self._check()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+class Counted:
+    """Wrap a binary file and report the bytes read to a progress bar."""
+    def __init__(self, inner, pbar):
+        self.inner = inner
+        self.pbar = pbar
+
+    def read(self, n = -1):
+        b = self.inner.read(n)
+        self.pbar.update(len(b))
+        return b
+
+def read_records(f, batch_size : int = 256, maxsize : int = 8):
+    """Decompress and parse the lines of `f` on a separate thread, yielding
+    `(text, record)` pairs. At most `maxsize` batches of `batch_size`
+    records are held in the queue. If the generator is closed early the
+    thread stops at its next batch."""
+    batches = queue.Queue(maxsize=maxsize)
+    stop = threading.Event()
+
+    def put(item) -> bool:
+        # Time out regularly so the thread notices when the consumer has
+        # gone away instead of blocking on a full queue forever
+        while not stop.is_set():
+            try:
+                batches.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def run():
+        try:
+            batch = []
+            for line in f:
+                data = orjson.loads(line)
+                batch.append((data['text'], data))
+                if len(batch) == batch_size:
+                    if not put(batch):
+                        return
+                    batch = []
+            if batch and not put(batch):
+                return
+            put(None)
+        except Exception as e:
+            put(e)
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    try:
+        while True:
+            batch = batches.get()
+            if batch is None:
+                break
+            if isinstance(batch, Exception):
+                raise batch
+            yield from batch
+    finally:
+        stop.set()
+        thread.join()
+
+@functools.lru_cache(maxsize=None)
+def load_model():
+    """Load the spaCy model once per process, so repeated calls to `main`
+    reuse it. The `nlp.pipe` workers are started with forkserver and
+    receive a pickled copy of the pipeline rather than sharing its pages."""
+    # Only the tagger and lemmatizer (and the tok2vec they listen to) are
+    # needed for the output fields, so the parser, NER and senter are not
+    # loaded at all
+    return spacy.load('en_core_web_sm', exclude=['parser', 'ner', 'senter'])
 
 def main(n : int):
-    nlp = spacy.load('en_core_web_sm')
-    for i in range(n):
-        print("Downloading segment %d" % i)
+    nlp = load_model()
+    n_process = max(1, (os.cpu_count() or 1) - 1)
+    stop = threading.Event()
+    def fetch(i : int) -> bool:
+        # Runs on the prefetch thread, so write above the progress bar of
+        # the segment being tagged rather than into it
+        tqdm.tqdm.write("Downloading segment %d" % i)
         url = "https://huggingface.co/datasets/allenai/c4/resolve/main/en/c4-train.%05d-of-01024.json.gz?download=true" % i
-        response = requests.get(url, stream=True)
-        if response.status_code == 200:
-            buffer = BytesIO(response.content)
-
-            with gzip.open("c4-train.%05d-of-01024.json.gz" % i, 'wt') as out:
-                with gzip.GzipFile(fileobj=buffer, mode="r") as f:
-                    for line in tqdm.tqdm(f, total=356000):
-                        data = json.loads(line)
-                        doc = nlp(data['text'])
-                        data["words"] = [[token.idx, token.idx + len(token.text)] for token in doc]
-                        data["pos"] = [token.pos_ for token in doc]
-                        data["lemma"] = [token.lemma_ for token in doc]
-                        out.write(json.dumps(data))
-                        out.write("\n")
+        return download(url, "c4-train.%05d-of-01024.download.json.gz" % i,
+                        stop=stop)
+
+    # The next segment is downloaded while the current one is tagged
+    prefetch = ThreadPoolExecutor(max_workers=1)
+    try:
+        pending = prefetch.submit(fetch, 0) if n > 0 else None
+        for i in range(n):
+            available = pending.result()
+            if i + 1 < n:
+                pending = prefetch.submit(fetch, i + 1)
+            if not available:
+                continue
+            download_path = "c4-train.%05d-of-01024.download.json.gz" % i
+            # Scoped to the segment so the lemma cache does not grow over the
+            # whole run
+            strings = {}
+            with BackgroundWriter("c4-train.%05d-of-01024.json.gz" % i) as out:
+                with open(download_path, "rb") as raw, \
+                        tqdm.tqdm(total=os.path.getsize(download_path),
+                                  unit='B', unit_scale=True) as pbar, \
+                        gzip.GzipFile(fileobj=Counted(raw, pbar), mode="rb") as f:
+                    for doc, data in nlp.pipe(read_records(f), batch_size=256,
+                                              n_process=n_process, as_tuples=True):
+                        data["words"], data["pos"], data["lemma"] = annotate(doc, strings)
+                        out.write(orjson.dumps(data, option=orjson.OPT_APPEND_NEWLINE))
+            os.remove(download_path)
+    except BaseException:
+        # Abandon the next segment rather than waiting for its download to
+        # finish, so an interrupted run exits promptly. Its progress is kept
+        # and the download resumes on the next run
+        stop.set()
+        prefetch.shutdown(wait=False, cancel_futures=True)
+        raise
+    prefetch.shutdown()
 
 if __name__ == '__main__':
     if len(sys.argv) < 2:
         print('Usage: python tag_corpus.py max_segs')
         sys.exit(1)
+    # nlp.pipe starts its workers while the prefetch, range download and
+    # writer threads are running, and forking with those threads holding
+    # locks can deadlock the workers. Set here rather than in `main`, as it
+    # changes the start method for the whole process
+    if multiprocessing.get_start_method() == "fork":
+        multiprocessing.set_start_method("forkserver", force=True)
     main(int(sys.argv[1]))
-
-
-
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The scripts in teanga-c4 are not a package, so make them importable
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,152 @@
+import http.server
+import os
+import re
+import threading
+import orjson
+import pytest
+import download
+
+DATA = os.urandom(1000003)
+
+class Server:
+    """A local server for `DATA` with range support. `/x` redirects to a
+    signed URL `/signed/<n>`, and URLs from earlier generations are
+    rejected with 403."""
+    def __init__(self):
+        self.etag = '"abc"'
+        self.head_etag = self.etag
+        self.generation = 0
+        self.fail = []
+        self.expire = False
+        self.requested = []
+        self.lock = threading.Lock()
+
+    def handler(self):
+        server = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def empty(self, status, headers={}):
+                self.send_response(status)
+                for k, v in headers.items():
+                    self.send_header(k, v)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+
+            def do_HEAD(self):
+                if self.path == '/x':
+                    self.empty(302, {'Location': '/signed/%d' % server.generation})
+                    if server.expire:
+                        server.expire = False
+                        server.generation += 1
+                    return
+                self.send_response(200)
+                self.send_header('Content-Length', str(len(DATA)))
+                self.send_header('Accept-Ranges', 'bytes')
+                self.send_header('ETag', server.head_etag)
+                self.end_headers()
+
+            def do_GET(self):
+                with server.lock:
+                    status = server.fail.pop(0) if server.fail else None
+                if status is not None:
+                    self.empty(status)
+                    return
+                if self.path != '/signed/%d' % server.generation:
+                    self.empty(403)
+                    return
+                if self.headers.get('If-Range') != server.etag:
+                    self.send_response(200)
+                    self.send_header('Content-Length', str(len(DATA)))
+                    self.end_headers()
+                    self.wfile.write(DATA)
+                    return
+                start, end = map(int, re.match(r'bytes=(\d+)-(\d+)',
+                                               self.headers['Range']).groups())
+                with server.lock:
+                    server.requested.append((start, end))
+                body = DATA[start:end + 1]
+                self.send_response(206)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
+
+@pytest.fixture
+def server(monkeypatch):
+    monkeypatch.setattr(download.time, "sleep", lambda _: None)
+    server = Server()
+    httpd = http.server.ThreadingHTTPServer(('127.0.0.1', 0), server.handler())
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    server.url = 'http://127.0.0.1:%d/x' % httpd.server_port
+    yield server
+    httpd.shutdown()
+
+def test_download(server, tmp_path):
+    path = str(tmp_path / "seg.gz")
+    assert download.download(server.url, path, timeout=5)
+    assert open(path, 'rb').read() == DATA
+    assert not os.path.exists(path + ".state")
+
+def test_download_retries_5xx(server, tmp_path):
+    server.fail = [503, 500, 429]
+    path = str(tmp_path / "seg.gz")
+    assert download.download(server.url, path, timeout=5)
+    assert open(path, 'rb').read() == DATA
+
+def test_download_reresolves_expired_url(server, tmp_path):
+    # The first signed URL expires as soon as it has been handed out
+    server.expire = True
+    path = str(tmp_path / "seg.gz")
+    assert download.download(server.url, path, timeout=5)
+    assert open(path, 'rb').read() == DATA
+
+def test_download_resume(server, tmp_path):
+    path = str(tmp_path / "seg.gz")
+    half = len(DATA) // 2
+    with open(path, 'wb') as f:
+        f.write(DATA[:half])
+        f.truncate(len(DATA))
+    with open(path + ".state", 'wb') as f:
+        f.write(orjson.dumps({'etag': server.etag, 'length': len(DATA),
+                              'ranges': [[0, len(DATA) - 1, half]]}))
+    assert download.download(server.url, path, timeout=5)
+    assert open(path, 'rb').read() == DATA
+    assert server.requested == [(half, len(DATA) - 1)]
+
+def test_download_truncated_state(server, tmp_path):
+    path = str(tmp_path / "seg.gz")
+    with open(path, 'wb') as f:
+        f.truncate(len(DATA))
+    with open(path + ".state", 'wb') as f:
+        f.write(b'{"etag": "\\"abc\\"", "len')
+    assert download.download(server.url, path, timeout=5)
+    assert open(path, 'rb').read() == DATA
+
+def test_download_etag_changed(server, tmp_path):
+    path = str(tmp_path / "seg.gz")
+    half = len(DATA) // 2
+    with open(path, 'wb') as f:
+        f.truncate(len(DATA))
+    with open(path + ".state", 'wb') as f:
+        f.write(orjson.dumps({'etag': server.etag, 'length': len(DATA),
+                              'ranges': [[0, len(DATA) - 1, half]]}))
+    # The file changes between the HEAD and the range requests
+    server.etag = '"new"'
+    with pytest.raises(IOError):
+        download.download(server.url, path, timeout=5)
+    assert not os.path.exists(path + ".state")
+
+def test_download_stop(server, tmp_path):
+    path = str(tmp_path / "seg.gz")
+    stop = threading.Event()
+    stop.set()
+    assert not download.download(server.url, path, timeout=5, stop=stop)
+    assert os.path.exists(path + ".state")
+    assert download.download(server.url, path, timeout=5)
+    assert open(path, 'rb').read() == DATA
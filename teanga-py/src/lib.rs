@@ -49,13 +49,29 @@ impl PyDiskCorpus {
         Ok(id)
     }
 
-    pub fn add_docs(&mut self, docs: Vec<HashMap<String, PyRawLayer>>) -> PyResult<()> {
-        self.0.add_docs(docs.into_iter().map(|doc| doc.iter().map(|(k,v)| (k.clone(), v.0.clone())).collect::<HashMap<String, Layer>>())
+    /// Add several documents in a single transaction
+    ///
+    /// # Arguments
+    /// * `docs` - The documents as maps from layer names to layers
+    ///
+    /// # Returns
+    /// The IDs of the new documents
+    pub fn add_docs(&mut self, docs: Vec<HashMap<String, PyRawLayer>>) -> PyResult<Vec<String>> {
+        self.0.add_docs(docs.into_iter().map(|doc| doc.into_iter().map(|(k,v)| (k, v.0)).collect::<HashMap<String, Layer>>())
             .collect::<Vec<HashMap<String, Layer>>>())
-            .map_err(|e| PyErr::new::<pyo3::exceptions::PyValueError, _>(format!("{}", e)))?;
-        Ok(())
+            .map_err(|e| PyErr::new::<pyo3::exceptions::PyValueError, _>(format!("{}", e)))
     }   
 
+    /// Create a new empty corpus with the same layers as this corpus
+    ///
+    /// # Arguments
+    /// * `path` - The path to the database of the new corpus, which must
+    ///   not already contain a corpus
+    pub fn clone_meta(&self, path : &str) -> PyResult<PyDiskCorpus> {
+        Ok(PyDiskCorpus(self.0.clone_meta(path)
+            .map_err(|e| PyErr::new::<pyo3::exceptions::PyIOError, _>(format!("{}", e)))?))
+    }
+
     pub fn get_doc_by_id(&self, id : &str) -> PyResult<HashMap<String, PyRawLayer>> {
         Ok(self.0.get_doc_by_id(id)
             .map_err(|e| PyErr::new::<pyo3::exceptions::PyValueError, _>(format!("{}", e)))?
@@ -0,0 +1,27 @@
+import pytest
+import teanga_pyo3.teanga as teangadb# if this fails the Rust code is not installed
+from teanga import Corpus
+
+def create_basic_corpus(db):
+    corpus = Corpus(db=db, new=True)
+    corpus.add_layer_meta("text")
+    _doc = corpus.add_doc("This is a document.")
+    return corpus
+
+@pytest.fixture(scope="session", autouse=True)
+def _check_teangadb(tmp_path_factory):
+    teangadb.Corpus(str(tmp_path_factory.mktemp("teangadb") / "db"))
+
+@pytest.fixture(scope="module")
+def basic_corpus(tmp_path_factory):
+    return create_basic_corpus(str(tmp_path_factory.mktemp("basic") / "db"))
+
+@pytest.fixture(scope="module")
+def searchable_corpus_template(tmp_path_factory):
+    # Tests take an empty copy with clone_meta rather than rebuilding the
+    # layers for every test
+    corpus = teangadb.Corpus(str(tmp_path_factory.mktemp("template") / "db"))
+    corpus.add_layer_meta("text", "characters", {})
+    corpus.add_layer_meta("words", "span", {}, "text")
+    corpus.add_layer_meta("pos", "seq", {}, "words", "string")
+    return corpus
@@ -1,84 +1,92 @@
-import teanga_pyo3.teanga as teangadb# if this fails the Rust code is not installed
+import teanga_pyo3.teanga as teangadb
+import pytest
 from teanga import Corpus, read_json_str, read_yaml_str
-import os
-import shutil
+import yaml
+import orjson
 from collections import Counter
 
-def test_teangadb_installed():
-    if os.path.exists("tmp.db"):
-        shutil.rmtree("tmp.db")
-    teangadb.Corpus("tmp.db")
-
-def test_create_corpus():
-    corpus = Corpus(db="tmp.db", new=True)
+def test_create_corpus(tmp_path):
+    corpus = Corpus(db=str(tmp_path / "db"), new=True)
     corpus.add_layer_meta("text")
     print(corpus.meta["text"].base)
     _doc = corpus.add_doc("This is a document.")
 
 
-def test_add_doc():
-    corpus = Corpus(db="tmp.db", new=True)
+def test_add_doc(tmp_path):
+    corpus = Corpus(db=str(tmp_path / "db"), new=True)
     corpus.add_layer_meta("text")
     _doc = corpus.add_doc("This is a document.")
 
-    corpus = Corpus(db="tmp.db", new=True)
+    corpus = Corpus(db=str(tmp_path / "db"), new=True)
     corpus.add_layer_meta("en", layer_type="characters")
     corpus.add_layer_meta("nl", layer_type="characters")
     _doc = corpus.add_doc(en="This is a document.", nl="Dit is een document.")
 
-def test_doc_ids():
-    corpus = Corpus(db="tmp.db", new=True)
-    corpus.add_layer_meta("text")
-    _doc = corpus.add_doc("This is a document.")
-    assert corpus.doc_ids == ['Kjco']
+def test_add_docs(searchable_corpus_template, tmp_path):
+    corpus = searchable_corpus_template.clone_meta(str(tmp_path / "db"))
+    ids = corpus.add_docs([
+        {"text": "This is a document.", "words": [(0,4), (5,7), (8,9), (10,18), (18,19)]},
+        {"text": "This is another document."}])
+    assert ids == corpus.order
+    assert corpus.get_doc_by_id(ids[0])["words"] == [(0,4), (5,7), (8,9), (10,18), (18,19)]
+    assert corpus.get_doc_by_id(ids[1])["text"] == "This is another document."
+
+def test_clone_meta(searchable_corpus_template, tmp_path):
+    corpus = searchable_corpus_template.clone_meta(str(tmp_path / "db"))
+    assert sorted(corpus.meta) == ["pos", "text", "words"]
+    assert corpus.order == []
+    ids = corpus.add_docs([{"text": "This is a document.",
+        "words": [(0,4), (5,7), (8,9), (10,18), (18,19)],
+        "pos": ["DT", "VBZ", "DT", "NN", "."]}])
+    assert searchable_corpus_template.order == []
+    reopened = teangadb.Corpus(str(tmp_path / "db"))
+    assert sorted(reopened.meta) == ["pos", "text", "words"]
+    assert reopened.order == ids
+
+def test_clone_meta_nonempty(searchable_corpus_template, tmp_path):
+    corpus = teangadb.Corpus(str(tmp_path / "db"))
+    corpus.add_layer_meta("text", "characters", {})
+    corpus.add_docs([{"text": "This is a document."}])
+    with pytest.raises(OSError):
+        searchable_corpus_template.clone_meta(str(tmp_path / "db"))
+    assert teangadb.Corpus(str(tmp_path / "db")).order == ['Kjco']
+
+def test_doc_ids(basic_corpus):
+    assert basic_corpus.doc_ids == ['Kjco']
  
-def test_docs():
-    corpus = Corpus(db="tmp.db", new=True)
-    corpus.add_layer_meta("text")
-    _doc = corpus.add_doc("This is a document.")
-    assert (str(corpus.docs) == "[('Kjco', Document('Kjco', " +
+def test_docs(basic_corpus):
+    assert (str(basic_corpus.docs) == "[('Kjco', Document('Kjco', " +
     "{'text': CharacterLayer('This is a document.')}))]")
  
-def test_doc_by_id():
-    corpus = Corpus(db="tmp.db", new=True)
-    corpus.add_layer_meta("text")
-    _doc = corpus.add_doc("This is a document.")
-    assert (str(corpus.doc_by_id("Kjco")) == 
+def test_doc_by_id(basic_corpus):
+    assert (str(basic_corpus.doc_by_id("Kjco")) == 
     "Document('Kjco', {'text': CharacterLayer('This is a document.')})")
 
-def test_meta():
-    corpus = Corpus(db="tmp.db", new=True)
-    corpus.add_layer_meta("text")
-    assert (str(corpus.meta) ==
+def test_meta(basic_corpus):
+    assert (str(basic_corpus.meta) ==
         "{'text': LayerDesc(layer_type='characters', base=None, data=None, " +
             "link_types=None, target=None, default=None, meta={})}")
  
-def test_to_yaml_str():
-    corpus = Corpus(db="tmp.db", new=True)
-    corpus.add_layer_meta("text")
-    _doc = corpus.add_doc("This is a document.")
-    assert (corpus.to_yaml_str() ==
-        '_meta:\n    text:\n        type: characters\n\
-Kjco:\n    text: This is a document.\n')
+def test_to_yaml_str(basic_corpus):
+    assert (yaml.safe_load(basic_corpus.to_yaml_str()) ==
+        yaml.safe_load('_meta:\n    text:\n        type: characters\n\
+Kjco:\n    text: This is a document.\n'))
 
-def test_to_json_str():
-    corpus = Corpus(db="tmp.db", new=True)
-    corpus.add_layer_meta("text")
-    _doc = corpus.add_doc("This is a document.")
-    assert (corpus.to_json_str() ==
-        '{"_meta":{"text":{"type":"characters"}},\
-"Kjco":{"text":"This is a document."}}')
+def test_to_json_str(basic_corpus):
+    assert (orjson.loads(basic_corpus.to_json_str()) ==
+        {"_meta": {"text": {"type": "characters"}},
+         "Kjco": {"text": "This is a document."}})
 
-def test_read_json_str():
+def test_read_json_str(tmp_path):
     read_json_str('{"_meta": {"text": {"type": \
-"characters"}},"Kjco": {"text": "This is a document."}}', "tmp.db")
+"characters"}},"Kjco": {"text": "This is a document."}}', str(tmp_path / "db"))
 
-def test_read_yaml_str():
+def test_read_yaml_str(tmp_path):
     read_yaml_str("_meta:\n  text:\n    type: characters\n\
-Kjco:\n   text: This is a document.\n", "tmp.db")
+Kjco:\n   text: This is a document.\n", str(tmp_path / "db"))
  
-def test_document_setitem():
-    corpus = Corpus(db="tmp.db", new=True)
+def test_document_setitem(tmp_path):
+    corpus = Corpus(db=str(tmp_path / "db"), new=True)
     corpus.add_layer_meta("text")
     corpus.add_layer_meta("words", layer_type="span", base="text")
     corpus.add_layer_meta("pos", layer_type="seq", base="words", data="string")
@@ -94,8 +102,8 @@ def test_document_setitem():
 'words': SpanLayer([(0, 4), (5, 7), (8, 9), (10, 18), (18, 19)]), \
 'pos': SeqLayer(['DT', 'VBZ', 'DT', 'NN', '.'])})")
 
-def test_add_layers():
-    corpus = Corpus(db="tmp.db", new=True)
+def test_add_layers(tmp_path):
+    corpus = Corpus(db=str(tmp_path / "db"), new=True)
     corpus.add_layer_meta("text")
     corpus.add_layer_meta("words", layer_type="span", base="text")
     corpus.add_layer_meta("pos", layer_type="seq", base="words", data="string")
@@ -103,8 +111,8 @@ def test_add_layers():
     doc.add_layers({"words": [(0,4), (5,7), (8,9), (10,18), (18,19)], \
             "pos": ["DT", "VBZ", "DT", "NN", "."]})
  
-def test_text_for_layer():
-    corpus = Corpus(db="tmp.db", new=True)
+def test_text_for_layer(tmp_path):
+    corpus = Corpus(db=str(tmp_path / "db"), new=True)
     corpus.add_layer_meta("text")
     corpus.add_layer_meta("words", layer_type="span", base="text")
     corpus.add_layer_meta("pos", layer_type="seq", base="words", data="string")
@@ -113,16 +121,16 @@ def test_text_for_layer():
     doc.pos = ["DT", "VBZ", "DT", "NN", "."]
     list(doc.text_for_layer("text"))
 
-def test_char_layers():
-    corpus = Corpus(db="tmp.db", new=True)
+def test_char_layers(tmp_path):
+    corpus = Corpus(db=str(tmp_path / "db"), new=True)
     corpus.add_layer_meta("text")
     doc = corpus.add_doc("This")
     assert (doc.text.data == [None, None, None, None])
     assert (doc.text.text == ['This'])
     assert (doc.text.indexes("text") == [(0, 1), (1, 2), (2, 3), (3, 4)])
 
-def test_seq_layers():
-    corpus = Corpus(db="tmp.db", new=True)
+def test_seq_layers(tmp_path):
+    corpus = Corpus(db=str(tmp_path / "db"), new=True)
     corpus.add_layer_meta("text")
     corpus.add_layer_meta("words", layer_type="span", base="text")
     corpus.add_layer_meta("pos", layer_type="seq", base="words", data="string")
@@ -134,8 +142,8 @@ def test_seq_layers():
     assert (doc.pos.indexes("pos") == [(0, 1), (1, 2), (2, 3), (3, 4), (4, 5)])
     assert (doc.pos.indexes("text") == [(0, 4), (5, 7), (8, 9), (10, 18), (18, 19)])
 
-def test_span_layer():
-    corpus = Corpus(db="tmp.db", new=True)
+def test_span_layer(tmp_path):
+    corpus = Corpus(db=str(tmp_path / "db"), new=True)
     corpus.add_layer_meta("text")
     corpus.add_layer_meta("words", layer_type="span", base="text")
     doc = corpus.add_doc("This is a document.")
@@ -145,8 +153,8 @@ def test_span_layer():
     assert (doc.words.indexes("words") == [(0, 1), (1, 2), (2, 3), (3, 4), (4, 5)])
     assert (doc.words.indexes("text") == [(0, 4), (5, 7), (8, 9), (10, 18), (18, 19)])
 
-def test_elem_layer():
-    corpus = Corpus(db="tmp.db", new=True)
+def test_elem_layer(tmp_path):
+    corpus = Corpus(db=str(tmp_path / "db"), new=True)
     corpus.add_layer_meta("text")
     corpus.add_layer_meta("words", layer_type="span", base="text")
     corpus.add_layer_meta("is_noun", layer_type="element", base="words", data="string")
@@ -159,8 +167,8 @@ def test_elem_layer():
     assert (doc.is_noun.indexes("words") == [(3, 4)])
     assert (doc.is_noun.indexes("text") == [(10, 18)])
 
-def test_update_docs():
-    corpus = Corpus(db="tmp.db", new=True)
+def test_update_docs(tmp_path):
+    corpus = Corpus(db=str(tmp_path / "db"), new=True)
     corpus.add_layer_meta("text")
     corpus.add_layer_meta("words", layer_type="span", base="text")
 
@@ -174,10 +182,10 @@ def test_update_docs():
     assert(doc.words.text == ['This', 'is', 'a', 'document', '.'])
 
 
-def test_read_yaml_str2():
+def test_read_yaml_str2(tmp_path):
     corpus = read_yaml_str("_meta:\n  text:\n    type: characters\n"
     "  author:\n    type: characters\nwiDv:\n   text: This is a document.\n"
-    "   author: John Doe\n", "tmp2.db")
+    "   author: John Doe\n", str(tmp_path / "db"))
 
     for _, doc in corpus.docs:
         assert(doc.text.text[0] == "This is a document.")
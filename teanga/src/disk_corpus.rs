@@ -57,6 +57,36 @@ impl DiskCorpus {
             path: path.to_string()
         }
     }
+
+    /// Create a new empty corpus with the same metadata as this corpus
+    ///
+    /// # Arguments
+    /// * `path` - The path to the database of the new corpus, which must
+    ///   not already contain a corpus
+    ///
+    /// # Returns
+    /// A new corpus object with no documents
+    pub fn clone_meta(&self, path : &str) -> TeangaResult<DiskCorpus> {
+        let db = open_db(path)?;
+        if !db.is_empty() {
+            return Err(TeangaError::ModelError(
+                format!("Cannot clone metadata into {}: database is not empty", path)));
+        }
+        let mut batch = sled::Batch::default();
+        for (name, layer_desc) in &self.meta {
+            let mut id_bytes = Vec::new();
+            id_bytes.push(META_PREFIX);
+            id_bytes.extend(name.as_bytes());
+            batch.insert(id_bytes, to_stdvec(layer_desc)?);
+        }
+        batch.insert(ORDER_BYTES.to_vec(), to_stdvec(&Vec::<String>::new())?);
+        db.apply_batch(batch).map_err(|e| TeangaError::DBError(e))?;
+        Ok(DiskCorpus {
+            meta: self.meta.clone(),
+            order: Vec::new(),
+            path: path.to_string()
+        })
+    }
 }
 
 
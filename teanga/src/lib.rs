@@ -430,6 +430,24 @@ mod test {
         let _corpus = DiskCorpus::new("tmp");
     }
 
+    #[test]
+    fn test_clone_meta() {
+        let mut corpus = DiskCorpus::new(tempfile::tempdir().unwrap().path().to_str().unwrap()).unwrap();
+        corpus.add_layer_meta("text".to_string(), LayerType::characters, None, None, None, None, None, HashMap::new()).unwrap();
+        corpus.add_doc(vec![("text".to_string(), "test")]).unwrap();
+        let path = tempfile::tempdir().unwrap().path().to_str().unwrap().to_owned();
+        let mut corpus2 = corpus.clone_meta(&path).unwrap();
+        assert_eq!(corpus2.get_meta(), corpus.get_meta());
+        assert!(corpus2.get_docs().is_empty());
+        corpus2.add_doc(vec![("text".to_string(), "test2")]).unwrap();
+        assert_eq!(corpus.get_docs().len(), 1);
+        let corpus3 = DiskCorpus::new(&path).unwrap();
+        assert_eq!(corpus3.get_meta(), corpus.get_meta());
+        assert_eq!(corpus3.get_docs().len(), 1);
+        assert!(corpus.clone_meta(&path).is_err());
+        assert_eq!(DiskCorpus::new(&path).unwrap().get_docs().len(), 1);
+    }
+
     #[test]
     fn test_serialize_layer() {
         let layer = Layer::L1S(vec![(1,"a".to_string()),(2,"b".to_string())]);
@@ -223,7 +223,19 @@ pub fn read_corpus_from_yaml_file<P: AsRef<Path>>(yaml_file : P, path: &str) ->
 }
 
 pub fn read_corpus_from_yaml_url(url: &str, path: &str) -> Result<DiskCorpus, SerializeError> {
-    let response = reqwest::blocking::get(url)?;
+    let parsed = reqwest::Url::parse(url).map_err(|e|
+        std::io::Error::new(std::io::ErrorKind::InvalidInput, e))?;
+    // Local files are read directly rather than through the HTTP client.
+    // The path is decoded from the URL, so percent-encoded characters such
+    // as spaces are handled
+    let response : Box<dyn Read> = if parsed.scheme() == "file" {
+        let file = parsed.to_file_path().map_err(|_|
+            std::io::Error::new(std::io::ErrorKind::InvalidInput,
+                format!("Not a local file URL: {}", url)))?;
+        Box::new(File::open(file)?)
+    } else {
+        Box::new(reqwest::blocking::get(parsed)?)
+    };
     let mut corpus = TransactionCorpus::new(path)?;
     if url.ends_with(".gz") {
         let mut decompressor = flate2::read::GzDecoder::new(response);
@@ -382,6 +394,30 @@ ecWc:
         read_corpus_from_yaml_string("_meta:\n  text:\n    type: characters\nKjco:\n   text: This is a document.\n", &file).unwrap();
     }
 
+    #[test]
+    fn test_read_file_url() {
+        let dir = tempfile::tempdir().expect("Cannot create temp folder");
+        let yaml_file = dir.path().join("corpus.yaml");
+        std::fs::write(&yaml_file, "_meta:\n  text:\n    type: characters\nKjco:\n   text: This is a document.\n").unwrap();
+        let file = tempfile::tempdir().expect("Cannot create temp folder")
+            .path().to_str().unwrap().to_owned();
+        let corpus = read_corpus_from_yaml_url(&format!("file://{}", yaml_file.to_str().unwrap()), &file).unwrap();
+        assert_eq!(corpus.get_docs(), vec!["Kjco".to_string()]);
+    }
+
+    #[test]
+    fn test_read_file_url_with_space() {
+        let dir = tempfile::tempdir().expect("Cannot create temp folder");
+        let yaml_file = dir.path().join("my corpus.yaml");
+        std::fs::write(&yaml_file, "_meta:\n  text:\n    type: characters\nKjco:\n   text: This is a document.\n").unwrap();
+        let file = tempfile::tempdir().expect("Cannot create temp folder")
+            .path().to_str().unwrap().to_owned();
+        let url = reqwest::Url::from_file_path(&yaml_file).unwrap();
+        assert!(url.as_str().contains("my%20corpus.yaml"));
+        let corpus = read_corpus_from_yaml_url(url.as_str(), &file).unwrap();
+        assert_eq!(corpus.get_docs(), vec!["Kjco".to_string()]);
+    }
+
     #[test]
     fn test_2() {
         let data = "_meta: